@@ -0,0 +1,34 @@
+# Global tuning knobs for the DOTS simulation.
+
+WIDTH = 1080
+HEIGHT = 1080
+FPS = 60
+
+BACKGROUND_COLOR = (8, 8, 16)
+BOUNDARY_COLOR = (210, 210, 220)
+BOUNDARY_THICKNESS = 6
+
+DOT_RADIUS = 5
+DOT_LIMIT = 10000
+INITIAL_DOT_SPEED = 200.0
+
+# A dot that touches the boundary is armed to split; the split fires this
+# many milliseconds later (so a fresh hit is visible before the burst).
+SPLIT_DELAY = 3000
+SPLIT_ANGLE_RANGE = 60.0
+
+# New dots trickle in from the center until DOT_LIMIT is reached.
+SPAWN_INTERVAL = 250
+
+# Angular broadphase for polygon boundaries: segments are bucketed by
+# their angle around the shape center so each dot only tests nearby
+# segments instead of all of them.
+BROADPHASE_BUCKETS = 64
+
+# Ameba (noisy blob) boundary generation.
+AMEBA_SEGMENTS = 360
+AMEBA_NOISE_FREQ = 1.7
+AMEBA_NOISE_AMP = 0.35
+AMEBA_SEED = 7
+
+DEFAULT_SHAPE = "Circle"
@@ -0,0 +1,78 @@
+"""Dot helpers.
+
+The actual dot state lives in structure-of-arrays form on `Simulation`
+(see simulation.py); `Dot` here is a thin index view kept for code that
+wants to talk about a single dot (debugging, picking, tooling) without
+copying anything out of the arrays.
+"""
+
+import random
+
+import pygame
+
+# Private RNG instance: skips the module-level indirection of the
+# random.* convenience functions on paths called in split bursts.
+_rng = random.Random()
+
+
+def random_color():
+    """A packed color bright enough to read against the dark background."""
+    r = _rng
+    return pack_color(
+        (r.randint(50, 255), r.randint(50, 255), r.randint(50, 255))
+    )
+
+
+def pack_color(rgb):
+    """An (r, g, b) tuple packed into one 0xRRGGBB int, as stored in the
+    simulation's uint32 color array."""
+    return (rgb[0] << 16) | (rgb[1] << 8) | rgb[2]
+
+
+def unpack_color(packed):
+    """The (r, g, b) tuple for a packed 0xRRGGBB color."""
+    c = int(packed)
+    return ((c >> 16) & 0xFF, (c >> 8) & 0xFF, c & 0xFF)
+
+
+class Dot:
+    """Read/write view of one slot in the simulation's SoA storage.
+
+    Holds no state of its own besides the index, so it is cheap to create
+    and safe to throw away.  Note that indices shift when the simulation
+    compacts its arrays, so views should not be kept across frames.
+    """
+
+    __slots__ = ("sim", "index")
+
+    def __init__(self, sim, index):
+        self.sim = sim
+        self.index = index
+
+    @property
+    def pos(self):
+        i = self.index
+        return pygame.math.Vector2(self.sim.pos_x[i], self.sim.pos_y[i])
+
+    @pos.setter
+    def pos(self, value):
+        i = self.index
+        self.sim.pos_x[i], self.sim.pos_y[i] = value
+
+    @property
+    def vel(self):
+        i = self.index
+        return pygame.math.Vector2(self.sim.vel_x[i], self.sim.vel_y[i])
+
+    @vel.setter
+    def vel(self, value):
+        i = self.index
+        self.sim.vel_x[i], self.sim.vel_y[i] = value
+
+    @property
+    def color(self):
+        return unpack_color(self.sim.colors[self.index])
+
+    @property
+    def needs_split(self):
+        return bool(self.sim.needs_split[self.index])
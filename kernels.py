@@ -0,0 +1,167 @@
+"""Numba-compiled collision kernels.
+
+Numba is optional: when it is installed the kernels below are JIT-compiled
+(cached on disk so the one-off compile cost is only paid once); without it
+they run as plain Python over the same arrays, which keeps behaviour
+identical, just slower.  Kernels take only scalars and ndarrays — no
+Python objects — and mutate the SoA arrays in place.
+"""
+
+import math
+
+try:
+    from numba import njit, prange
+
+    HAVE_NUMBA = True
+except ImportError:  # pragma: no cover - exercised only without numba
+    HAVE_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+
+        return wrap
+
+
+@njit(cache=True, fastmath=True)
+def collide_circle(
+    pos_x,
+    pos_y,
+    vel_x,
+    vel_y,
+    needs_split,
+    split_timer_start,
+    last_nx,
+    last_ny,
+    cx,
+    cy,
+    collision_distance,
+    now,
+    n,
+):
+    """Bounce the first `n` dots off a circular boundary.
+
+    Dots at or beyond `collision_distance` from the center (cx, cy) are
+    clamped back onto it, their velocity reflected about the boundary
+    normal, and armed to split at time `now`.
+    """
+    cd_sq = collision_distance * collision_distance
+    for i in range(n):
+        ox = pos_x[i] - cx
+        oy = pos_y[i] - cy
+        dist_sq = ox * ox + oy * oy
+        # Squared-distance early-out: only the handful of dots actually
+        # touching the wall pay for the sqrt and normalize below.
+        if dist_sq >= cd_sq:
+            # dist >= collision_distance > 0 here, so no zero guard needed.
+            inv_dist = 1.0 / math.sqrt(dist_sq)
+            nx = ox * inv_dist
+            ny = oy * inv_dist
+            pos_x[i] = cx + nx * collision_distance
+            pos_y[i] = cy + ny * collision_distance
+            vx = vel_x[i]
+            vy = vel_y[i]
+            vdotn = vx * nx + vy * ny
+            vel_x[i] = vx - 2.0 * vdotn * nx
+            vel_y[i] = vy - 2.0 * vdotn * ny
+            last_nx[i] = -nx
+            last_ny[i] = -ny
+            if not needs_split[i]:
+                needs_split[i] = True
+                split_timer_start[i] = now
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def collide_polygon(
+    pos_x,
+    pos_y,
+    vel_x,
+    vel_y,
+    needs_split,
+    split_timer_start,
+    last_nx,
+    last_ny,
+    seg_ax,
+    seg_ay,
+    seg_vx,
+    seg_vy,
+    seg_len_sq,
+    seg_nx,
+    seg_ny,
+    bucket_start,
+    seg_index,
+    cx,
+    cy,
+    inset,
+    dt,
+    now,
+    n,
+):
+    """Bounce the first `n` dots off a polygon boundary.
+
+    Segments come in flattened SoA form (start point, segment vector,
+    squared length, outward unit normal) plus a CSR-style angular
+    broadphase: `seg_index[bucket_start[b]:bucket_start[b+1]]` lists the
+    segments whose angular extent around the shape center (cx, cy)
+    overlaps bucket `b`.  Each dot only tests its own angular bucket and
+    the two neighbours instead of every segment.  On a hit the dot is
+    clamped `inset` inside the segment, reflected about its normal and
+    armed to split.  Each iteration of the outer loop touches only dot
+    `i`'s slots, so the dots parallelize cleanly with prange.
+    """
+    n_buckets = bucket_start.shape[0] - 1
+    inset_sq = inset * inset
+    two_pi = 2.0 * math.pi
+    for i in prange(n):
+        vx = vel_x[i]
+        vy = vel_y[i]
+        px = pos_x[i] + vx * dt
+        py = pos_y[i] + vy * dt
+        b = int((math.atan2(py - cy, px - cx) + math.pi) / two_pi * n_buckets)
+        if b >= n_buckets:  # atan2 == +pi lands exactly on the seam
+            b = 0
+        hit = False
+        for bo in range(-1, 2):
+            bb = (b + bo) % n_buckets
+            for k in range(bucket_start[bb], bucket_start[bb + 1]):
+                j = seg_index[k]
+                nx = seg_nx[j]
+                ny = seg_ny[j]
+                # Only segments we are moving toward can be hit.
+                if vx * nx + vy * ny <= 0.0:
+                    continue
+                ax = seg_ax[j]
+                ay = seg_ay[j]
+                lsq = seg_len_sq[j]
+                if lsq < 1e-9:
+                    cxp = ax
+                    cyp = ay
+                else:
+                    t = ((px - ax) * seg_vx[j] + (py - ay) * seg_vy[j]) / lsq
+                    if t < 0.0:
+                        t = 0.0
+                    elif t > 1.0:
+                        t = 1.0
+                    cxp = ax + seg_vx[j] * t
+                    cyp = ay + seg_vy[j] * t
+                gx = px - cxp
+                gy = py - cyp
+                if gx * gx + gy * gy <= inset_sq or gx * nx + gy * ny > 0.0:
+                    vdotn = vx * nx + vy * ny
+                    vel_x[i] = vx - 2.0 * vdotn * nx
+                    vel_y[i] = vy - 2.0 * vdotn * ny
+                    pos_x[i] = cxp - nx * inset
+                    pos_y[i] = cyp - ny * inset
+                    last_nx[i] = -nx
+                    last_ny[i] = -ny
+                    if not needs_split[i]:
+                        needs_split[i] = True
+                        split_timer_start[i] = now
+                    hit = True
+                    break
+            if hit:
+                break
@@ -0,0 +1,47 @@
+"""Entry point: window setup, input handling, main loop."""
+
+import pygame
+
+import config
+from simulation import Simulation
+
+SHAPE_KEYS = {
+    pygame.K_1: "Circle",
+    pygame.K_2: "Square",
+    pygame.K_3: "Triangle",
+    pygame.K_4: "Ameba",
+}
+
+
+def main():
+    pygame.init()
+    screen = pygame.display.set_mode((config.WIDTH, config.HEIGHT))
+    pygame.display.set_caption("DOTS")
+    clock = pygame.time.Clock()
+
+    sim = Simulation(screen)
+    sim.reset()
+
+    running = True
+    while running:
+        dt = clock.tick(config.FPS) / 1000.0
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.key == pygame.K_r:
+                    sim.reset()
+                elif event.key in SHAPE_KEYS:
+                    sim.set_shape(SHAPE_KEYS[event.key])
+
+        sim.update(dt)
+        sim.draw()
+        pygame.display.flip()
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
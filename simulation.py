@@ -0,0 +1,540 @@
+"""Core simulation: SoA dot storage, boundary collisions, splitting.
+
+Dot state is kept as parallel NumPy arrays (structure-of-arrays) owned by
+`Simulation` and indexed by slot; the first `n_active` slots are live.
+Per-frame integration is a vectorized array op; collision handling and
+split bookkeeping walk the live slots.
+"""
+
+import math
+import random
+
+import numpy as np
+import pygame
+from opensimplex import OpenSimplex
+
+import config
+import kernels
+from dot import Dot, random_color, unpack_color
+
+# See dot._rng: a private instance avoids the random.* module-function
+# indirection on the spawn/split paths.
+_rng = random.Random()
+
+
+# fblits (pygame-ce) skips building the returned rect list; fall back to
+# blits with doreturn=0 on plain pygame, which is the same batched call.
+_HAS_FBLITS = hasattr(pygame.Surface, "fblits")
+
+
+def find_closest_point_on_segment(px, py, ax, ay, bx, by):
+    """Closest point to (px, py) on the segment (ax, ay)-(bx, by).
+
+    Takes and returns plain floats: this runs N*S times per frame on the
+    non-numba path, so it must not allocate Vector2 temporaries.
+    """
+    dx = bx - ax
+    dy = by - ay
+    seg_len_sq = dx * dx + dy * dy
+    if seg_len_sq < 1e-9:
+        return ax, ay
+    t = ((px - ax) * dx + (py - ay) * dy) / seg_len_sq
+    t = 0.0 if t < 0.0 else (1.0 if t > 1.0 else t)
+    return ax + dx * t, ay + dy * t
+
+
+class Simulation:
+    def __init__(self, screen):
+        self.screen = screen
+        self.center = pygame.math.Vector2(config.WIDTH / 2, config.HEIGHT / 2)
+
+        cap = config.DOT_LIMIT
+        self.dot_limit = cap
+        self.pos_x = np.zeros(cap, dtype=np.float64)
+        self.pos_y = np.zeros(cap, dtype=np.float64)
+        self.vel_x = np.zeros(cap, dtype=np.float64)
+        self.vel_y = np.zeros(cap, dtype=np.float64)
+        self.needs_split = np.zeros(cap, dtype=np.bool_)
+        self.split_timer_start = np.zeros(cap, dtype=np.int64)
+        self.last_normal_x = np.zeros(cap, dtype=np.float64)
+        self.last_normal_y = np.zeros(cap, dtype=np.float64)
+        # Colors ride in the SoA arrays too, packed 0xRRGGBB: 4 bytes per
+        # dot instead of a tuple of boxed ints, and cheaper sprite-cache
+        # keys during the draw pass.
+        self.colors = np.zeros(cap, dtype=np.uint32)
+        self.n_active = 0
+        # Scratch bitset used by _remove; lives here so removal never
+        # allocates.
+        self._dead = np.zeros(cap, dtype=np.bool_)
+
+        # One white dot sprite rasterized up front; per-color sprites are
+        # tinted copies of it, cached lazily.
+        size = 2 * config.DOT_RADIUS + 1
+        self._base_sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(
+            self._base_sprite,
+            (255, 255, 255),
+            (config.DOT_RADIUS, config.DOT_RADIUS),
+            config.DOT_RADIUS,
+        )
+        self._sprite_cache = {}
+
+        self.shapes = {}
+        self.define_shapes()
+        self.current_shape_data = self.shapes[config.DEFAULT_SHAPE]
+        self._on_shape_changed()
+        self.last_spawn_time = 0
+
+    # ------------------------------------------------------------------
+    # Shapes
+    # ------------------------------------------------------------------
+
+    def define_shapes(self):
+        """Build the boundary catalogue (circle plus polygon shapes).
+
+        Polygon shapes carry a 'segments' list of
+        (v_start, v_end, seg_vec, seg_len_sq, normal_outward) tuples used
+        by the collision code; normals point out of the playable area.
+        """
+        cx, cy = self.center.x, self.center.y
+        max_extent = min(config.WIDTH, config.HEIGHT) / 2 - 40
+
+        self.shapes["Circle"] = {
+            "type": "circle",
+            "center": pygame.math.Vector2(self.center),
+            "radius": max_extent,
+        }
+
+        half = max_extent / math.sqrt(2)
+        square_pts = [
+            pygame.math.Vector2(cx - half, cy - half),
+            pygame.math.Vector2(cx + half, cy - half),
+            pygame.math.Vector2(cx + half, cy + half),
+            pygame.math.Vector2(cx - half, cy + half),
+        ]
+        self.shapes["Square"] = self._make_polygon(square_pts)
+
+        tri_pts = []
+        for k in range(3):
+            ang = -math.pi / 2 + k * 2 * math.pi / 3
+            tri_pts.append(
+                pygame.math.Vector2(
+                    cx + max_extent * math.cos(ang),
+                    cy + max_extent * math.sin(ang),
+                )
+            )
+        self.shapes["Triangle"] = self._make_polygon(tri_pts)
+
+        # Ameba: a noisy blob.  The noise is sampled once into an array,
+        # then the radii are rescaled in place so the blob's largest
+        # radius lands exactly on max_extent - no second noise pass.
+        simplex = OpenSimplex(seed=config.AMEBA_SEED)
+        base_r = max_extent * 0.8
+        freq = config.AMEBA_NOISE_FREQ
+        amp = config.AMEBA_NOISE_AMP * base_r
+
+        theta = np.linspace(
+            0, 2 * np.pi, config.AMEBA_SEGMENTS, endpoint=False
+        )
+        cos_t = np.cos(theta)
+        sin_t = np.sin(theta)
+        noise = np.fromiter(
+            (
+                simplex.noise2(cos_t[k] * freq, sin_t[k] * freq)
+                for k in range(config.AMEBA_SEGMENTS)
+            ),
+            dtype=np.float64,
+            count=config.AMEBA_SEGMENTS,
+        )
+        r = np.maximum(base_r * 0.2, base_r + amp * noise)
+        r *= max_extent / r.max()
+        xs = cx + r * cos_t
+        ys = cy + r * sin_t
+        ameba_pts = [
+            pygame.math.Vector2(x, y) for x, y in zip(xs, ys)
+        ]
+        self.shapes["Ameba"] = self._make_polygon(ameba_pts)
+
+    def _make_polygon(self, points):
+        """Shape data for a convex-ish polygon given CCW-or-CW points."""
+        segments = []
+        n = len(points)
+        for k in range(n):
+            v_start = points[k]
+            v_end = points[(k + 1) % n]
+            seg_vec = v_end - v_start
+            seg_len_sq = seg_vec.length_squared()
+            normal = pygame.math.Vector2(seg_vec.y, -seg_vec.x)
+            if normal.length_squared() > 1e-9:
+                normal = normal.normalize()
+            # Orient the normal away from the shape center.
+            mid = (v_start + v_end) / 2
+            if normal.dot(mid - self.center) < 0:
+                normal = -normal
+            segments.append((v_start, v_end, seg_vec, seg_len_sq, normal))
+        # Flat float tuples for the Python fallback loop: unpacking nine
+        # floats is cheaper than pulling .x/.y off nested Vector2s per
+        # segment per dot.
+        segments_flat = [
+            (s[0].x, s[0].y, s[1].x, s[1].y, s[2].x, s[2].y, s[3], s[4].x, s[4].y)
+            for s in segments
+        ]
+        # Flattened SoA copy of the segment data for the numba kernel.
+        seg_arrays = (
+            np.array([s[0].x for s in segments], dtype=np.float64),
+            np.array([s[0].y for s in segments], dtype=np.float64),
+            np.array([s[2].x for s in segments], dtype=np.float64),
+            np.array([s[2].y for s in segments], dtype=np.float64),
+            np.array([s[3] for s in segments], dtype=np.float64),
+            np.array([s[4].x for s in segments], dtype=np.float64),
+            np.array([s[4].y for s in segments], dtype=np.float64),
+        )
+        bucket_start, seg_index = self._build_angular_buckets(segments)
+        return {
+            "type": "polygon",
+            "points": points,
+            "segments": segments,
+            "segments_flat": segments_flat,
+            "seg_arrays": seg_arrays,
+            "bucket_start": bucket_start,
+            "seg_index": seg_index,
+        }
+
+    def _build_angular_buckets(self, segments):
+        """Angular broadphase for a polygon that is star-shaped around
+        the arena center.
+
+        Each segment is registered in every bucket its angular extent
+        (swept from its start vertex to its end vertex along the shorter
+        arc) overlaps, so a dot only ever needs its own angular bucket
+        plus the two neighbours.  Returned as CSR arrays: `seg_index`
+        holds segment indices grouped by bucket and `bucket_start[b]`
+        points at the start of bucket b's group.
+        """
+        n_buckets = config.BROADPHASE_BUCKETS
+        two_pi = 2 * math.pi
+
+        def bucket_of(p):
+            ang = math.atan2(p.y - self.center.y, p.x - self.center.x)
+            b = int((ang + math.pi) / two_pi * n_buckets)
+            return 0 if b >= n_buckets else b
+
+        per_bucket = [[] for _ in range(n_buckets)]
+        for j, (v_start, v_end, _, _, _) in enumerate(segments):
+            b0 = bucket_of(v_start)
+            b1 = bucket_of(v_end)
+            span = (b1 - b0) % n_buckets
+            if span > n_buckets // 2:
+                b0, b1 = b1, b0
+                span = n_buckets - span
+            for step in range(span + 1):
+                per_bucket[(b0 + step) % n_buckets].append(j)
+
+        bucket_start = np.zeros(n_buckets + 1, dtype=np.int64)
+        for b in range(n_buckets):
+            bucket_start[b + 1] = bucket_start[b] + len(per_bucket[b])
+        seg_index = np.array(
+            [j for bucket in per_bucket for j in bucket], dtype=np.int64
+        )
+        return bucket_start, seg_index
+
+    def set_shape(self, name):
+        if name in self.shapes:
+            self.current_shape_data = self.shapes[name]
+            self._on_shape_changed()
+            self.reset()
+
+    def _on_shape_changed(self):
+        """Precompute the collision scalars for the current shape and
+        bind the matching collision routine, so the per-frame code does
+        no dict lookups, string compares or repeated arithmetic."""
+        data = self.current_shape_data
+        self._inset = config.BOUNDARY_THICKNESS / 2.0 + config.DOT_RADIUS
+        if data["type"] == "circle":
+            self._collision_distance = data["radius"] - self._inset
+            self._segments = None
+            self._collide_fn = self._collide_circle_all
+        else:
+            self._collision_distance = 0.0
+            self._segments = data["segments_flat"]
+            self._collide_fn = (
+                self._collide_polygon_all
+                if kernels.HAVE_NUMBA
+                else self._collide_polygon_fallback
+            )
+
+        # Pre-render the static background (clear color + boundary) so
+        # draw() restores it with one blit instead of a full-surface
+        # fill plus re-rasterizing the boundary every frame.  The Ameba
+        # outline alone is a 360-vertex polygon.
+        background = pygame.Surface((config.WIDTH, config.HEIGHT))
+        background.fill(config.BACKGROUND_COLOR)
+        if data["type"] == "circle":
+            pygame.draw.circle(
+                background,
+                config.BOUNDARY_COLOR,
+                data["center"],
+                data["radius"],
+                config.BOUNDARY_THICKNESS,
+            )
+        else:
+            pygame.draw.polygon(
+                background,
+                config.BOUNDARY_COLOR,
+                data["points"],
+                config.BOUNDARY_THICKNESS,
+            )
+        self._background = background
+
+    def reset(self):
+        self.n_active = 0
+        self.last_spawn_time = pygame.time.get_ticks()
+
+    # ------------------------------------------------------------------
+    # Dots
+    # ------------------------------------------------------------------
+
+    def spawn_dot(self):
+        """Add one dot at the center with a random heading."""
+        i = self.n_active
+        angle = _rng.uniform(0, 2 * math.pi)
+        self.pos_x[i] = self.center.x
+        self.pos_y[i] = self.center.y
+        self.vel_x[i] = config.INITIAL_DOT_SPEED * math.cos(angle)
+        self.vel_y[i] = config.INITIAL_DOT_SPEED * math.sin(angle)
+        self.needs_split[i] = False
+        self.split_timer_start[i] = 0
+        self.last_normal_x[i] = 0.0
+        self.last_normal_y[i] = 0.0
+        self.colors[i] = random_color()
+        self.n_active += 1
+
+    def split(self, i):
+        """Replace dot `i` with two children fanned around its rebound
+        direction.
+
+        The parent's slot is reused in place for the first child and the
+        second child is appended, so splitting allocates nothing and
+        needs no removal pass afterwards.  Returns the two slot indices.
+        """
+        # Scalar polar math: the old from_polar + normalize dance built
+        # several Vector2 temporaries per child.  Velocity is never zero
+        # (reflection preserves speed), so atan2 is safe.
+        base_angle = math.atan2(self.vel_y[i], self.vel_x[i])
+        half_range = math.radians(config.SPLIT_ANGLE_RANGE / 2)
+        speed = config.INITIAL_DOT_SPEED
+        shift_len = config.DOT_RADIUS * 1.1
+
+        parent_x = self.pos_x[i]
+        parent_y = self.pos_y[i]
+        uniform = _rng.uniform
+        for j in (i, self.n_active):
+            angle = base_angle + uniform(-half_range, half_range)
+            c = math.cos(angle)
+            s = math.sin(angle)
+            self.pos_x[j] = parent_x + shift_len * c
+            self.pos_y[j] = parent_y + shift_len * s
+            self.vel_x[j] = speed * c
+            self.vel_y[j] = speed * s
+            self.needs_split[j] = False
+            self.split_timer_start[j] = 0
+            self.last_normal_x[j] = 0.0
+            self.last_normal_y[j] = 0.0
+            self.colors[j] = random_color()
+        self.n_active += 1
+        return (i, self.n_active - 1)
+
+    # ------------------------------------------------------------------
+    # Collisions
+    # ------------------------------------------------------------------
+
+    def _collide_circle_all(self, dt, now):
+        """Bounce all live dots off the circle boundary and arm hit
+        dots to split at time `now`."""
+        center = self.current_shape_data["center"]
+        kernels.collide_circle(
+                self.pos_x,
+                self.pos_y,
+                self.vel_x,
+                self.vel_y,
+                self.needs_split,
+                self.split_timer_start,
+                self.last_normal_x,
+                self.last_normal_y,
+                center.x,
+                center.y,
+                self._collision_distance,
+                now,
+                self.n_active,
+            )
+
+    def _collide_polygon_all(self, dt, now):
+        """Bounce all live dots off the polygon boundary via the numba
+        kernel and arm hit dots to split at time `now`."""
+        data = self.current_shape_data
+        seg_ax, seg_ay, seg_vx, seg_vy, seg_len_sq, seg_nx, seg_ny = data[
+            "seg_arrays"
+        ]
+        kernels.collide_polygon(
+                self.pos_x,
+                self.pos_y,
+                self.vel_x,
+                self.vel_y,
+                self.needs_split,
+                self.split_timer_start,
+                self.last_normal_x,
+                self.last_normal_y,
+                seg_ax,
+                seg_ay,
+                seg_vx,
+                seg_vy,
+                seg_len_sq,
+                seg_nx,
+                seg_ny,
+                data["bucket_start"],
+                data["seg_index"],
+                self.center.x,
+                self.center.y,
+                self._inset,
+                dt,
+                now,
+                self.n_active,
+            )
+
+    def _collide_polygon_fallback(self, dt, now):
+        """Plain-Python polygon collision for installs without numba."""
+        for i in range(self.n_active):
+            self._collide_polygon_one(i, dt, now)
+
+    def _collide_polygon_one(self, i, dt, now):
+        # Scalar math throughout: Vector2 temporaries here cost an
+        # allocation per segment per dot on the non-numba path.
+        vx = self.vel_x[i]
+        vy = self.vel_y[i]
+        px = self.pos_x[i] + vx * dt
+        py = self.pos_y[i] + vy * dt
+        # Locals beat repeated attribute/dict lookups in this loop.
+        inset = self._inset
+        inset_sq = inset * inset
+        for ax, ay, bx, by, sx, sy, seg_len_sq, nx, ny in self._segments:
+            # Only segments we are moving toward can be hit.
+            if vx * nx + vy * ny <= 0.0:
+                continue
+            cxp, cyp = find_closest_point_on_segment(px, py, ax, ay, bx, by)
+            gx = px - cxp
+            gy = py - cyp
+            if gx * gx + gy * gy <= inset_sq or gx * nx + gy * ny > 0.0:
+                vdotn = vx * nx + vy * ny
+                self.vel_x[i] = vx - 2.0 * vdotn * nx
+                self.vel_y[i] = vy - 2.0 * vdotn * ny
+                self.pos_x[i] = cxp - nx * inset
+                self.pos_y[i] = cyp - ny * inset
+                self._mark_split(i, -nx, -ny, now)
+                break
+
+    def _mark_split(self, i, inward_nx, inward_ny, now):
+        self.last_normal_x[i] = inward_nx
+        self.last_normal_y[i] = inward_ny
+        if not self.needs_split[i]:
+            self.needs_split[i] = True
+            self.split_timer_start[i] = now
+
+    # ------------------------------------------------------------------
+    # Frame update / draw
+    # ------------------------------------------------------------------
+
+    def update(self, dt):
+        # Read the clock once per frame and thread it through; get_ticks
+        # is cheap but was being called all over the update path.
+        now = pygame.time.get_ticks()
+        dot_limit = self.dot_limit
+
+        if (
+            self.n_active < dot_limit
+            and now - self.last_spawn_time >= config.SPAWN_INTERVAL
+        ):
+            self.spawn_dot()
+            self.last_spawn_time = now
+
+        n = self.n_active
+        self.pos_x[:n] += self.vel_x[:n] * dt
+        self.pos_y[:n] += self.vel_y[:n] * dt
+
+        self._collide_fn(dt, now)
+
+        # One vectorized pass finds every dot whose split timer expired.
+        ready = self.needs_split[:n] & (
+            now - self.split_timer_start[:n] >= config.SPLIT_DELAY
+        )
+        for i in np.flatnonzero(ready):
+            if self.n_active < dot_limit:
+                self.split(i)
+            else:
+                # No room: disarm so we do not retry every frame.
+                self.needs_split[i] = False
+
+    def _remove(self, indices):
+        """Compact the live slots, dropping the given indices.
+
+        Membership goes through the preallocated `_dead` bitset rather
+        than a Python set or sorted list, which also collapses duplicate
+        indices for free.  Swap-with-last: each dropped slot is
+        overwritten by the current tail element, so the cost is
+        O(removed) plus the mask scan.  Dot order is not meaningful, so
+        the shuffle is fine.  Slots are processed high-to-low so a
+        swapped-in tail element is never itself a pending removal.
+        """
+        n = self.n_active
+        dead = self._dead
+        dead[indices] = True
+        for i in np.flatnonzero(dead[:n])[::-1]:
+            n -= 1
+            if i != n:
+                self.pos_x[i] = self.pos_x[n]
+                self.pos_y[i] = self.pos_y[n]
+                self.vel_x[i] = self.vel_x[n]
+                self.vel_y[i] = self.vel_y[n]
+                self.needs_split[i] = self.needs_split[n]
+                self.split_timer_start[i] = self.split_timer_start[n]
+                self.last_normal_x[i] = self.last_normal_x[n]
+                self.last_normal_y[i] = self.last_normal_y[n]
+                self.colors[i] = self.colors[n]
+        dead[: self.n_active] = False
+        self.n_active = n
+
+    def dot(self, i):
+        """A `Dot` view of slot `i` (valid until the next compaction)."""
+        return Dot(self, i)
+
+    def draw(self):
+        self.screen.blit(self._background, (0, 0))
+        # Batch all dots into a single blit call instead of one
+        # pygame.draw.circle round-trip per dot.
+        r = config.DOT_RADIUS
+        sprite = self._dot_sprite
+        pos_x = self.pos_x
+        pos_y = self.pos_y
+        colors = self.colors
+        blit_seq = [
+            (sprite(colors[i]), (pos_x[i] - r, pos_y[i] - r))
+            for i in range(self.n_active)
+        ]
+        if _HAS_FBLITS:
+            self.screen.fblits(blit_seq)
+        else:
+            self.screen.blits(blit_seq, doreturn=0)
+
+    def _dot_sprite(self, packed):
+        """The cached sprite surface for a packed color, tinting the
+        white base sprite on first use (a multiply fill, no
+        re-rasterization)."""
+        key = int(packed)
+        sprite = self._sprite_cache.get(key)
+        if sprite is None:
+            sprite = self._base_sprite.copy()
+            sprite.fill(
+                unpack_color(key) + (255,),
+                special_flags=pygame.BLEND_RGBA_MULT,
+            )
+            self._sprite_cache[key] = sprite
+        return sprite